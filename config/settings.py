@@ -37,6 +37,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     'rest_framework',
     'django_filters',
@@ -47,6 +48,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Compress responses; must come before middleware that reads the body
+    'django.middleware.gzip.GZipMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -91,6 +94,35 @@ DATABASES = {
 }
 
 
+# Cache
+# Redis when REDIS_URL is set (e.g. redis://redis:6379/1), otherwise
+# Django's per-process in-memory cache for local development and tests
+
+REDIS_URL = config('REDIS_URL', default='')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': REDIS_URL,
+            'OPTIONS': {
+                'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            },
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Cache list pages and send ETags for them
+# Only safe with a cache every worker shares: a per-process LocMem cache
+# can't see other workers' invalidations (tests turn it on explicitly)
+LIST_CACHE_ENABLED = config('LIST_CACHE_ENABLED', default=bool(REDIS_URL), cast=bool)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -137,7 +169,8 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework settings
 REST_FRAMEWORK = {
     # Pagination: Required to return 20 items per page
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    # Estimated counts skip COUNT(*) on large unfiltered tables
+    'DEFAULT_PAGINATION_CLASS': 'diagnosis.pagination.EstimatedCountPagination',
     'PAGE_SIZE': 20,  # Requirement: batches of 20
     
     # Filtering: Enable query parameters like ?version=ICD-10
@@ -148,8 +181,9 @@ REST_FRAMEWORK = {
     ],
     
     # Renderer: JSON only for API (no browsable API in production)
+    # orjson encodes the same JSON several times faster
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'diagnosis.renderers.ORJSONRenderer',
     ],
     
     # Performance: Compact JSON response
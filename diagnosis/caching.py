@@ -0,0 +1,196 @@
+import hashlib
+import time
+from functools import partial, wraps
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+"""
+Response caching for the list endpoints
+
+Why cache list pages?
+- ICD data changes rarely (bulk re-imports, occasional edits)
+- The list endpoints are the hot path, so repeated queries can skip
+  the database and serialization entirely
+
+How is the cache invalidated?
+- Every key embeds a per-table version counter
+- Writes bump the counter (model signals, import_icd), so stale pages
+  are simply never looked up again and expire on their own
+- The same key gives each list response its ETag, so clients can
+  revalidate with If-None-Match and get a bodyless 304
+
+Why only with a shared cache (LIST_CACHE_ENABLED)?
+- With a per-process cache (LocMem) each worker keeps its own pages and
+  version counters, so a write only invalidates the worker that handled
+  it, and the same data gets a different ETag from every worker
+"""
+
+CODES = 'dxcode'
+CATEGORIES = 'dxcategory'
+
+# CODES version diagnosis_code_search was last refreshed at
+SEARCH_VIEW_VERSION = 'dxcode_search_ver'
+
+# Seconds a cached page is kept
+CACHE_TIMEOUT = 300
+
+# Seconds a client or CDN may keep serving a page while it revalidates
+STALE_WHILE_REVALIDATE = 600
+
+
+def _version_key(namespace):
+    return f'{namespace}_ver'
+
+
+def _current_version(namespace):
+    """
+    Read a namespace's version counter, creating it if missing
+
+    Why seed from the clock and not 0? A flushed cache would otherwise
+    restart at a version (and so an ETag) already handed out for older data
+    """
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def list_cache_key(namespace, request):
+    """
+    Build the cache key for a list request
+
+    The absolute URI is hashed (not just the query string) because the
+    next/previous links in the payload include the host
+    """
+    options_hash = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    version = _current_version(namespace)
+    return f'{namespace}:{options_hash}:{version}'
+
+
+def list_cache_enabled():
+    return settings.LIST_CACHE_ENABLED
+
+
+def cached_list(namespace, request):
+    """
+    Look up a list page: returns (cache_key, data)
+
+    data is None on a miss; cache_key is None when list caching is off
+    """
+    if not list_cache_enabled():
+        return None, None
+    cache_key = list_cache_key(namespace, request)
+    return cache_key, cache.get(cache_key)
+
+
+def store_list(cache_key, data):
+    """
+    Save a list page under the key cached_list() returned
+    """
+    if cache_key is not None:
+        cache.set(cache_key, data, CACHE_TIMEOUT)
+
+
+def list_etag(namespace, request):
+    """
+    ETag for a list response
+
+    Changes whenever the cache key does, i.e. on any write to the
+    namespace. The Accept header is mixed in because JSON and the
+    browsable API render the same data differently.
+    None (no ETag) when list caching is off
+    """
+    if not list_cache_enabled():
+        return None
+    key = f"{list_cache_key(namespace, request)}:{request.META.get('HTTP_ACCEPT', '')}"
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def bump_version(*namespaces):
+    """
+    Invalidate every cached page for the given namespaces
+    """
+    for namespace in namespaces:
+        key = _version_key(namespace)
+        cache.add(key, time.time_ns(), timeout=None)  # No-op if the counter exists
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Evicted between add() and incr()
+            cache.set(key, time.time_ns(), timeout=None)
+
+
+def search_view_version():
+    """
+    The CODES version a diagnosis_code_search refresh starting now reflects
+
+    Read before the refresh, so a write made during it leaves the view
+    marked stale
+    """
+    return _current_version(CODES)
+
+
+def mark_search_view_refreshed(version):
+    cache.set(SEARCH_VIEW_VERSION, version, timeout=None)
+
+
+def search_view_is_current():
+    """
+    True if no code or category was written since diagnosis_code_search
+    was last refreshed
+
+    Every such write bumps the CODES version, so a view refreshed at an
+    older version may still hold deleted, deactivated or edited codes, or
+    miss new ones. A missing marker (flushed cache, or a per-process
+    cache the refresh didn't run in) also counts as stale
+    """
+    return cache.get(SEARCH_VIEW_VERSION) == _current_version(CODES)
+
+
+def public_list_response(response):
+    """
+    Let browsers and shared caches (CDNs) keep a list page
+
+    The data is a public catalog, so any cache may store it for
+    CACHE_TIMEOUT and then revalidate with the ETag. Vary keeps JSON and
+    other renderings apart (GZipMiddleware adds Accept-Encoding itself)
+    """
+    patch_cache_control(
+        response,
+        public=True,
+        max_age=CACHE_TIMEOUT,
+        stale_while_revalidate=STALE_WHILE_REVALIDATE,
+    )
+    patch_vary_headers(response, ('Accept',))
+    return response
+
+
+def list_conditional(namespace):
+    """
+    ETag revalidation (If-None-Match -> 304) for a GET/POST list view
+
+    Why not plain @condition? It would also check POSTs against the list
+    ETag, so a create sent with If-Match could fail with a 412. And its
+    304 carries none of the caching headers of the 200 it stands for,
+    which shared caches need to keep treating the page the same way
+    (RFC 7232 section 4.1)
+    """
+    def decorator(view):
+        conditional_view = condition(etag_func=partial(list_etag, namespace))(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            response = conditional_view(request, *args, **kwargs)
+            if response.status_code == 304:
+                public_list_response(response)
+                # GZipMiddleware only adds this to the 200
+                patch_vary_headers(response, ('Accept-Encoding',))
+            return response
+        return wrapper
+    return decorator
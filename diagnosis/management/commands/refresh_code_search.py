@@ -0,0 +1,58 @@
+import time
+from django.core.management.base import BaseCommand
+from diagnosis.caching import mark_search_view_refreshed, search_view_version
+from diagnosis.models import DiagnosisCodeSearch
+
+"""
+Management Command for Refreshing the Code Search View
+
+Why a command and not a refresh on every write?
+- A refresh rebuilds the whole diagnosis_code_search view, far more work
+  than the single-row write that would trigger it
+- Run from a request, it adds that cost to every create/update/delete and
+  repeats it for each write in a burst
+- Until the next refresh, searches read diagnosis_diagnosiscode instead
+  (see search_view_is_current), so results never lag a write; import_icd
+  still refreshes the view itself when it finishes
+- Nothing else refreshes the view, so run it periodically (--interval)
+
+Usage:
+    python manage.py refresh_code_search
+    python manage.py refresh_code_search --interval=60
+"""
+
+
+class Command(BaseCommand):
+    help = "Refresh the diagnosis_code_search materialized view"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help='Keep running, refreshing every INTERVAL seconds (default: refresh once)'
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        while True:
+            self._refresh()
+            if not interval:
+                return
+            time.sleep(interval)
+
+    def _refresh(self):
+        """
+        Rebuild the view concurrently, so searches keep reading it meanwhile,
+        then let searches use it again
+        """
+        start = time.monotonic()
+        version = search_view_version()
+        DiagnosisCodeSearch.refresh()
+        mark_search_view_refreshed(version)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Refreshed {DiagnosisCodeSearch._meta.db_table} "
+                f"in {time.monotonic() - start:.2f}s"
+            )
+        )
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.10 on 2026-10-15 07:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diagnosis', '0002_alter_diagnosiscategory_options_and_more'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='diagnosiscode',
+            name='diagnosis_d_icd_ver_612fa2_idx',
+        ),
+        migrations.AddIndex(
+            model_name='diagnosiscode',
+            index=models.Index(fields=['icd_version', 'is_active', 'full_code'], include=('abbreviated_description', 'category'), name='dx_ver_active_code_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.10 on 2026-10-15 07:47
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diagnosis', '0003_remove_diagnosiscode_diagnosis_d_icd_ver_612fa2_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='diagnosiscategory',
+            options={'verbose_name_plural': 'Diagnosis Categories'},
+        ),
+        migrations.AlterModelOptions(
+            name='diagnosiscode',
+            options={'verbose_name_plural': 'Diagnosis Codes'},
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.10 on 2026-10-15 07:55
+
+from django.db import migrations, models
+
+# Stored labels and the integers that replace them
+VERSIONS = {"ICD-9": "9", "ICD-10": "10", "ICD-11": "11"}
+
+
+def labels_to_numbers(apps, schema_editor):
+    """
+    Rewrite "ICD-10" as "10" while the column is still varchar,
+    so the AlterField cast to smallint succeeds
+    """
+    for model_name in ("DiagnosisCategory", "DiagnosisCode"):
+        model = apps.get_model("diagnosis", model_name)
+        for label, number in VERSIONS.items():
+            model.objects.filter(icd_version=label).update(icd_version=number)
+
+
+def numbers_to_labels(apps, schema_editor):
+    for model_name in ("DiagnosisCategory", "DiagnosisCode"):
+        model = apps.get_model("diagnosis", model_name)
+        for label, number in VERSIONS.items():
+            model.objects.filter(icd_version=number).update(icd_version=label)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diagnosis', '0005_diagnosiscode_dx_search_trgm'),
+    ]
+
+    operations = [
+        migrations.RunPython(labels_to_numbers, numbers_to_labels),
+        # The varchar_pattern_ops indexes still carry the name of the old
+        # "version" column, so AlterField's own DROP INDEX misses them
+        migrations.RunSQL(
+            [
+                'DROP INDEX IF EXISTS "diagnosis_diagnosiscategory_version_e1e23fd8_like"',
+                'DROP INDEX IF EXISTS "diagnosis_diagnosiscode_version_03b1ee3d_like"',
+            ],
+            migrations.RunSQL.noop,
+        ),
+        migrations.AlterField(
+            model_name='diagnosiscategory',
+            name='icd_version',
+            field=models.SmallIntegerField(choices=[(9, 'ICD-9'), (10, 'ICD-10'), (11, 'ICD-11')], db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='diagnosiscode',
+            name='icd_version',
+            field=models.SmallIntegerField(choices=[(9, 'ICD-9'), (10, 'ICD-10'), (11, 'ICD-11')], db_index=True),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.10 on 2026-10-15 08:00
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diagnosis', '0006_icd_version_smallint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='diagnosiscode',
+            name='search_tsv',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.SearchVector('full_code', 'abbreviated_description', 'full_description', config='simple'), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddIndex(
+            model_name='diagnosiscode',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_tsv'], name='dx_search_tsv'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.10 on 2026-10-15 08:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diagnosis', '0007_diagnosiscode_search_tsv'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='diagnosiscode',
+            name='diagnosis_d_categor_6ed690_idx',
+        ),
+        migrations.AddIndex(
+            model_name='diagnosiscode',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['full_code', 'icd_version'], name='dx_active_code_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='diagnosiscode',
+            index=models.Index(fields=['category', 'is_active', 'full_code'], name='dx_cat_active_code_idx'),
+        ),
+    ]
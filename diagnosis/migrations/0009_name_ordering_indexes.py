@@ -0,0 +1,23 @@
+# Generated by Django 5.2.10 on 2026-10-15 08:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diagnosis', '0008_diagnosiscode_list_indexes'),
+    ]
+
+    operations = [
+        migrations.RenameIndex(
+            model_name='diagnosiscategory',
+            new_name='dx_category_ver_code_idx',
+            old_name='diagnosis_d_icd_ver_d748c7_idx',
+        ),
+        migrations.RenameIndex(
+            model_name='diagnosiscode',
+            new_name='dx_ver_code_idx',
+            old_name='diagnosis_d_icd_ver_7a8a83_idx',
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.10 on 2026-10-15 08:05
+
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+# Active codes only, with just the list columns and the search document
+# search_tsv is copied from the generated column, not recomputed
+CREATE_VIEW = """
+CREATE MATERIALIZED VIEW diagnosis_code_search AS
+SELECT id, category_id, full_code, abbreviated_description, icd_version,
+       is_active, search_tsv
+FROM diagnosis_diagnosiscode
+WHERE is_active
+"""
+
+CREATE_INDEXES = [
+    # REFRESH ... CONCURRENTLY requires a unique index
+    "CREATE UNIQUE INDEX dx_code_search_id ON diagnosis_code_search (id)",
+    # Cursor pagination order
+    "CREATE UNIQUE INDEX dx_code_search_code ON diagnosis_code_search (full_code, icd_version)",
+    "CREATE INDEX dx_code_search_tsv ON diagnosis_code_search USING gin (search_tsv)",
+    # Same UPPER() expressions as dx_search_trgm, for the icontains branch
+    "CREATE INDEX dx_code_search_trgm ON diagnosis_code_search USING gin "
+    "(UPPER(full_code) gin_trgm_ops, UPPER(abbreviated_description) gin_trgm_ops)",
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diagnosis', '0009_name_ordering_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            [CREATE_VIEW, *CREATE_INDEXES],
+            "DROP MATERIALIZED VIEW IF EXISTS diagnosis_code_search",
+        ),
+        migrations.CreateModel(
+            name='DiagnosisCodeSearch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('full_code', models.CharField(max_length=20)),
+                ('abbreviated_description', models.CharField(max_length=255)),
+                ('icd_version', models.SmallIntegerField(choices=[(9, 'ICD-9'), (10, 'ICD-10'), (11, 'ICD-11')])),
+                ('is_active', models.BooleanField()),
+                ('search_tsv', django.contrib.postgres.search.SearchVectorField()),
+            ],
+            options={
+                'db_table': 'diagnosis_code_search',
+                'managed': False,
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.10 on 2026-10-15 08:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diagnosis', '0010_diagnosis_code_search'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='diagnosiscode',
+            name='dx_ver_active_code_idx',
+        ),
+        migrations.AddIndex(
+            model_name='diagnosiscode',
+            index=models.Index(fields=['icd_version', 'is_active', 'full_code'], include=('id', 'abbreviated_description', 'category'), name='dx_ver_active_code_idx'),
+        ),
+    ]
@@ -1,4 +1,29 @@
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.db import connection, models
+from django.db.models.functions import Upper
+
+
+# Why integers? A smallint is 2 bytes in every row and index entry,
+# while "ICD-10" as varchar costs 7. The label lives here, not on disk
+ICD_VERSION_CHOICES = [
+    (9, "ICD-9"),
+    (10, "ICD-10"),
+    (11, "ICD-11"),
+]
+# Label lookup for the per-row paths (serializing, __str__)
+ICD_VERSION_LABELS = dict(ICD_VERSION_CHOICES)
+
+
+def parse_icd_version(value):
+    """
+    Map an ICD version as clients send it ("ICD-10", "10" or 10)
+    to the stored integer. Returns None for unknown versions
+    """
+    for number, label in ICD_VERSION_CHOICES:
+        if value in (number, label, str(number)):
+            return number
+    return None
 
 
 class DiagnosisCategory(models.Model):
@@ -8,7 +33,7 @@ class DiagnosisCategory(models.Model):
     """
     code = models.CharField(max_length=20, db_index=True)
     title = models.CharField(max_length=255)
-    icd_version = models.CharField(max_length=10, db_index=True)  # "ICD-9", "ICD-10", "ICD-11"
+    icd_version = models.SmallIntegerField(choices=ICD_VERSION_CHOICES, db_index=True)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -17,12 +42,13 @@ class DiagnosisCategory(models.Model):
         verbose_name_plural = "Diagnosis Categories"
         unique_together = ("code", "icd_version")
         indexes = [
-            models.Index(fields=['icd_version', 'code']),
+            # Same columns and direction as the list's order_by, so pages
+            # are read in index order with no Sort node
+            models.Index(fields=['icd_version', 'code'], name='dx_category_ver_code_idx'),
         ]
-        ordering = ['icd_version', 'code']
     
     def __str__(self):
-        return f"{self.icd_version}: {self.code} - {self.title}"
+        return f"{ICD_VERSION_LABELS.get(self.icd_version, self.icd_version)}: {self.code} - {self.title}"
 
 
 class DiagnosisCode(models.Model):
@@ -44,8 +70,18 @@ class DiagnosisCode(models.Model):
     abbreviated_description = models.CharField(max_length=255)
     full_description = models.TextField()
     
+    # Full-text search document, kept up to date by Postgres on every write
+    # Why 'simple'? ICD codes and clinical terms shouldn't be stemmed
+    search_tsv = models.GeneratedField(
+        expression=SearchVector(
+            'full_code', 'abbreviated_description', 'full_description', config='simple'
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+    
     # Version - for multi-version support
-    icd_version = models.CharField(max_length=10, db_index=True)  # "ICD-9", "ICD-10", "ICD-11"
+    icd_version = models.SmallIntegerField(choices=ICD_VERSION_CHOICES, db_index=True)
     
     # Status tracking
     is_active = models.BooleanField(default=True, db_index=True)
@@ -60,11 +96,81 @@ class DiagnosisCode(models.Model):
         verbose_name_plural = "Diagnosis Codes"
         unique_together = ("full_code", "icd_version")
         indexes = [
-            models.Index(fields=['icd_version', 'full_code']),
-            models.Index(fields=['icd_version', 'is_active']),
-            models.Index(fields=['category', 'icd_version']),
+            # ?icd_version= list: WHERE icd_version = X ORDER BY full_code
+            models.Index(fields=['icd_version', 'full_code'], name='dx_ver_code_idx'),
+            # Default list query: filter on version + is_active, sorted by code
+            # INCLUDE lets the list columns come straight from the index;
+            # id is needed too or every row goes back to the heap for it
+            models.Index(
+                fields=['icd_version', 'is_active', 'full_code'],
+                include=['id', 'abbreviated_description', 'category'],
+                name='dx_ver_active_code_idx',
+            ),
+            # Default list page: WHERE is_active ORDER BY full_code, icd_version
+            # Partial, so inactive codes don't take up space in it
+            models.Index(
+                fields=['full_code', 'icd_version'],
+                condition=models.Q(is_active=True),
+                name='dx_active_code_idx',
+            ),
+            # ?category= list: filter on category + is_active, sorted by code
+            models.Index(
+                fields=['category', 'is_active', 'full_code'],
+                name='dx_cat_active_code_idx',
+            ),
+            # Trigram index so ?search= substring matches use an index scan
+            # instead of reading the whole table. Django compiles icontains
+            # to UPPER(col) LIKE UPPER('%term%'), so the index is on UPPER()
+            GinIndex(
+                OpClass(Upper('full_code'), name='gin_trgm_ops'),
+                OpClass(Upper('abbreviated_description'), name='gin_trgm_ops'),
+                name='dx_search_trgm',
+            ),
+            # ?search= word matches: search_tsv @@ websearch_to_tsquery(...)
+            GinIndex(fields=['search_tsv'], name='dx_search_tsv'),
         ]
-        ordering = ['icd_version', 'full_code']
     
     def __str__(self):
-        return f"{self.icd_version}: {self.full_code} - {self.abbreviated_description}"
\ No newline at end of file
+        return f"{ICD_VERSION_LABELS.get(self.icd_version, self.icd_version)}: {self.full_code} - {self.abbreviated_description}"
+
+
+class DiagnosisCodeSearch(models.Model):
+    """
+    Read-only view of the active codes, for ?search= (autocomplete)
+
+    Backed by the diagnosis_code_search materialized view (migration
+    0010): just the list columns and search_tsv, so its table and
+    indexes are a fraction of diagnosis_diagnosiscode's size and stay
+    in memory while clients type
+    """
+    category = models.ForeignKey(
+        DiagnosisCategory,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+        null=True,
+    )
+    full_code = models.CharField(max_length=20)
+    abbreviated_description = models.CharField(max_length=255)
+    icd_version = models.SmallIntegerField(choices=ICD_VERSION_CHOICES)
+    is_active = models.BooleanField()
+    search_tsv = SearchVectorField()
+
+    class Meta:
+        managed = False
+        db_table = 'diagnosis_code_search'
+
+    @classmethod
+    def refresh(cls, concurrently=True):
+        """
+        Rebuild the view from diagnosis_diagnosiscode
+
+        CONCURRENTLY keeps it readable during the refresh (it relies on
+        the unique index on id) but applies the changes row by row; a
+        plain refresh rebuilds it in bulk, faster after large imports
+        """
+        option = "CONCURRENTLY " if concurrently else ""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"REFRESH MATERIALIZED VIEW {option}{connection.ops.quote_name(cls._meta.db_table)}"
+            )
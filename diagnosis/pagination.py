@@ -0,0 +1,85 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import PageNumberPagination
+
+"""
+Pagination helpers
+
+Why estimated counts?
+- PageNumberPagination runs SELECT COUNT(*) on every list request
+- On large ICD tables that count costs more than fetching the page itself
+- PostgreSQL already tracks an approximate row count in pg_class.reltuples
+"""
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that uses the planner's row estimate for unfiltered querysets
+
+    Falls back to an exact COUNT(*) when the queryset is filtered, when the
+    database is not PostgreSQL, or when the table is small enough that the
+    exact count is cheap (the estimate is also -1 before the first ANALYZE)
+
+    The estimate can be off since the last ANALYZE, which only matters at
+    the end of the list: a page on or past the estimated last page, or one
+    that comes back short, is re-checked against the exact count. Otherwise
+    the real last page could 404, or link to an empty next page
+    """
+    estimate_threshold = 10000
+    count_is_estimate = False
+
+    @cached_property
+    def count(self):
+        estimate = self._estimated_count()
+        if estimate is not None and estimate >= self.estimate_threshold:
+            self.count_is_estimate = True
+            return estimate
+        return super().count
+
+    def page(self, number):
+        if self.count_is_estimate and self._on_or_past_last_page(number):
+            self._use_exact_count()
+        page = super().page(number)
+        if self.count_is_estimate and len(page) < self.per_page:
+            # A short page is the real end of the list
+            self._use_exact_count()
+        return page
+
+    def _on_or_past_last_page(self, number):
+        try:
+            return int(number) >= self.num_pages
+        except (TypeError, ValueError):
+            return False  # validate_number() reports it
+
+    def _use_exact_count(self):
+        """Replace the estimate with COUNT(*), and the page total with it"""
+        self.__dict__['count'] = Paginator.count.func(self)
+        self.__dict__.pop('num_pages', None)
+        self.count_is_estimate = False
+
+    def _estimated_count(self):
+        queryset = self.object_list
+        query = getattr(queryset, 'query', None)
+        if query is None or query.where or query.distinct:
+            return None
+
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+
+class EstimatedCountPagination(PageNumberPagination):
+    """
+    Page number pagination backed by EstimatedCountPaginator
+    next/previous links and the response shape are unchanged
+    """
+    django_paginator_class = EstimatedCountPaginator
@@ -0,0 +1,31 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+"""
+Response renderers
+
+Why orjson?
+- Encoding JSON is a large share of the CPU time of a list page
+- orjson is a compiled encoder, several times faster than the stdlib
+  json module DRF's JSONRenderer uses
+"""
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    Compact UTF-8 JSON, encoded with orjson
+
+    Types orjson doesn't know (Decimal, lazy translation strings...) go
+    through DRF's own encoder, so the output matches JSONRenderer.
+    Indented output (Accept: application/json; indent=4) is left to
+    JSONRenderer, since orjson only indents by two spaces
+    """
+    _fallback = JSONEncoder().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(data, default=self._fallback)
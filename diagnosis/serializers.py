@@ -1,11 +1,39 @@
 from rest_framework import serializers
-from .models import DiagnosisCategory, DiagnosisCode
+from .models import (
+    ICD_VERSION_CHOICES,
+    ICD_VERSION_LABELS,
+    DiagnosisCategory,
+    DiagnosisCode,
+    parse_icd_version,
+)
+
+
+class IcdVersionField(serializers.ChoiceField):
+    """
+    icd_version is stored as a small integer but the API speaks labels
+    Why? Clients keep sending and receiving "ICD-10" as before
+    """
+    def __init__(self, **kwargs):
+        super().__init__(choices=[label for _, label in ICD_VERSION_CHOICES], **kwargs)
+
+    def to_internal_value(self, data):
+        # Also accept the stored number (10 or "10")
+        version = parse_icd_version(data)
+        if version is None:
+            self.fail('invalid_choice', input=data)
+        return version
+
+    def to_representation(self, value):
+        # Called once per row; a plain dict lookup, no choices scan
+        return ICD_VERSION_LABELS[value]
 
 
 class DiagnosisCategorySerializer(serializers.ModelSerializer):
     """
     Serializer for DiagnosisCategory model
     """
+    icd_version = IcdVersionField()
+
     class Meta:
         model = DiagnosisCategory
         fields = [
@@ -24,6 +52,7 @@ class DiagnosisCodeSerializer(serializers.ModelSerializer):
     Full serializer for DiagnosisCode - used for detail views and create/update
     """
     category_details = DiagnosisCategorySerializer(source='category', read_only=True)
+    icd_version = IcdVersionField()
     
     class Meta:
         model = DiagnosisCode
@@ -61,19 +90,15 @@ class DiagnosisCodeSerializer(serializers.ModelSerializer):
         return data
 
 
-class DiagnosisCodeListSerializer(serializers.ModelSerializer):
+class DiagnosisCodeListSerializer(serializers.Serializer):
     """
     Lightweight serializer for list views
+    Renders the dicts from DiagnosisCode.objects.values(...), with the
+    category code already joined in as category_code
     """
-    category_code = serializers.CharField(source='category.code', read_only=True)
-    
-    class Meta:
-        model = DiagnosisCode
-        fields = [
-            'id',
-            'full_code',
-            'abbreviated_description',
-            'icd_version',
-            'category_code',
-            'is_active'
-        ]
+    id = serializers.IntegerField(read_only=True)
+    full_code = serializers.CharField(read_only=True)
+    abbreviated_description = serializers.CharField(read_only=True)
+    icd_version = IcdVersionField(read_only=True)
+    category_code = serializers.CharField(read_only=True)
+    is_active = serializers.BooleanField(read_only=True)
@@ -0,0 +1,27 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .caching import CATEGORIES, CODES, bump_version
+from .models import DiagnosisCategory, DiagnosisCode
+
+"""
+Signal handlers
+
+Why signals? Writes from the API, the shell, or any other code path
+invalidate cached list pages without each caller remembering to
+"""
+
+
+@receiver(post_save, sender=DiagnosisCode)
+@receiver(post_delete, sender=DiagnosisCode)
+def invalidate_code_lists(sender, **kwargs):
+    # diagnosis_code_search is not refreshed here: the refresh_code_search
+    # command does that periodically. The bump also marks the view stale,
+    # so searches read the main table until then
+    bump_version(CODES)
+
+
+@receiver(post_save, sender=DiagnosisCategory)
+@receiver(post_delete, sender=DiagnosisCategory)
+def invalidate_category_lists(sender, **kwargs):
+    # Code list pages embed category_code, so they go stale too
+    bump_version(CATEGORIES, CODES)
@@ -1,9 +1,16 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
-from diagnosis.models import DiagnosisCategory, DiagnosisCode
+from diagnosis.caching import mark_search_view_refreshed, search_view_version
+from diagnosis.models import DiagnosisCategory, DiagnosisCode, DiagnosisCodeSearch
 import time
+from io import StringIO
+from unittest import mock
 
 """
 API Tests
@@ -17,31 +24,45 @@ Why test APIs?
 """
 
 
+@override_settings(LIST_CACHE_ENABLED=True)
 class DiagnosisCodeAPITest(TestCase):
     """Test DiagnosisCode API endpoints"""
     
-    def setUp(self):
-        """Create test data before each test"""
-        self.client = APIClient()
-        
+    @classmethod
+    def setUpTestData(cls):
+        """
+        Create test data once for the whole class
+        Why? Each test runs in a transaction that is rolled back, so the
+        rows don't need re-inserting before every test
+        """
         # Create test category
-        self.category = DiagnosisCategory.objects.create(
+        cls.category = DiagnosisCategory.objects.create(
             code="C21",
             title="Malignant neoplasm of anus and anal canal",
-            icd_version="ICD-10"
+            icd_version=10
         )
         
         # Create 25 test codes (to test pagination beyond 20)
-        for i in range(25):
-            DiagnosisCode.objects.create(
-                category=self.category,
+        DiagnosisCode.objects.bulk_create([
+            DiagnosisCode(
+                category=cls.category,
                 diagnosis_code=f"{i:04d}",
                 full_code=f"C21{i:04d}",
                 abbreviated_description=f"Test code {i}",
                 full_description=f"Full description for test code {i}",
-                icd_version="ICD-10",
+                icd_version=10,
                 is_active=True
             )
+            for i in range(25)
+        ])
+        # The search view only sees rows once refresh_code_search runs
+        DiagnosisCodeSearch.refresh()
+    
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()  # Cached list pages must not leak between tests
+        # The view was refreshed in setUpTestData, so searches may read it
+        mark_search_view_refreshed(search_view_version())
     
     # ==================== LIST ENDPOINT TESTS ====================
     
@@ -56,24 +77,29 @@ class DiagnosisCodeAPITest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data['results']), 20)  # First page: 20 items
         self.assertIsNotNone(response.data['next'])  # Has next page
-        self.assertEqual(response.data['count'], 25)  # Total count
+        self.assertIsNone(response.data['previous'])  # First page
     
     def test_list_codes_second_page(self):
-        """Test pagination to second page"""
+        """Test pagination to second page by following the next cursor"""
         url = reverse('diagnosis-code-list-create')
-        response = self.client.get(url, {'page': 2})
+        first_page = self.client.get(url)
+        response = self.client.get(first_page.data['next'])
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data['results']), 5)  # Remaining 5 items
         self.assertIsNone(response.data['next'])  # No next page
         self.assertIsNotNone(response.data['previous'])  # Has previous page
+        # No overlap between pages
+        first_codes = {code['full_code'] for code in first_page.data['results']}
+        second_codes = {code['full_code'] for code in response.data['results']}
+        self.assertFalse(first_codes & second_codes)
     
-    def test_list_codes_empty_page(self):
-        """Test requesting page that doesn't exist"""
+    def test_list_codes_invalid_cursor(self):
+        """Test requesting a cursor that can't be decoded"""
         url = reverse('diagnosis-code-list-create')
-        response = self.client.get(url, {'page': 999})
+        response = self.client.get(url, {'cursor': 'not-a-cursor'})
         
-        # DRF returns 404 for invalid page
+        # DRF returns 404 for invalid cursor
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
     
     # ==================== RETRIEVE ENDPOINT TESTS ====================
@@ -92,7 +118,16 @@ class DiagnosisCodeAPITest(TestCase):
         self.assertEqual(response.data['id'], code.id)
         # Should include nested category details
         self.assertIn('category_details', response.data)
-    
+
+    def test_retrieve_code_indented(self):
+        """Test an indent= media type parameter is honoured by the renderer"""
+        code = DiagnosisCode.objects.first()
+        url = reverse('diagnosis-code-detail', kwargs={'pk': code.id})
+        response = self.client.get(url, HTTP_ACCEPT='application/json; indent=4')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(b'\n    "id": ', response.content)
+
     def test_retrieve_nonexistent_code(self):
         """Test retrieving code that doesn't exist"""
         url = reverse('diagnosis-code-detail', kwargs={'pk': 99999})
@@ -121,6 +156,7 @@ class DiagnosisCodeAPITest(TestCase):
         
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(response.data['full_code'], 'C219999')
+        self.assertEqual(response.data['icd_version'], 'ICD-10')
         # Verify database record created
         self.assertEqual(
             DiagnosisCode.objects.filter(full_code='C219999').count(), 
@@ -140,6 +176,22 @@ class DiagnosisCodeAPITest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn('full_code', response.data)  # Error for missing field
     
+    def test_create_code_unknown_version(self):
+        """Test creating code with an unsupported icd_version label"""
+        url = reverse('diagnosis-code-list-create')
+        data = {
+            'category': self.category.id,
+            'diagnosis_code': '9999',
+            'full_code': 'C219999',
+            'abbreviated_description': 'New test code',
+            'full_description': 'New test code full description',
+            'icd_version': 'ICD-12',
+        }
+        response = self.client.post(url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('icd_version', response.data)
+
     def test_create_code_duplicate(self):
         """Test creating duplicate code (same full_code + icd_version)"""
         existing_code = DiagnosisCode.objects.first()
@@ -238,7 +290,7 @@ class DiagnosisCodeAPITest(TestCase):
             full_code="ICD9TEST",
             abbreviated_description="ICD-9 test",
             full_description="ICD-9 test description",
-            icd_version="ICD-9",
+            icd_version=9,
             is_active=True
         )
         
@@ -259,7 +311,7 @@ class DiagnosisCodeAPITest(TestCase):
             full_code="INACTIVE01",
             abbreviated_description="Inactive code",
             full_description="Inactive code",
-            icd_version="ICD-10",
+            icd_version=10,
             is_active=False
         )
         
@@ -270,9 +322,9 @@ class DiagnosisCodeAPITest(TestCase):
         self.assertTrue(all(code['is_active'] for code in response.data['results']))
         
         # Include inactive
-        response = self.client.get(url, {'include_inactive': 'true'})
+        response = self.client.get(url, {'include_inactive': 'true', 'page_size': 100})
         # Should now include the inactive code
-        self.assertEqual(response.data['count'], 26)  # 25 + 1 inactive
+        self.assertEqual(len(response.data['results']), 26)  # 25 + 1 inactive
     
     def test_search_codes(self):
         """Test search functionality"""
@@ -283,8 +335,227 @@ class DiagnosisCodeAPITest(TestCase):
         self.assertGreater(len(response.data['results']), 0)
         # Should find the code with full_code=C210000
     
+    def test_search_partial_code(self):
+        """Test a dotted partial code matches codes by prefix"""
+        url = reverse('diagnosis-code-list-create')
+        response = self.client.get(url, {'search': 'C21.002'})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        codes = [code['full_code'] for code in response.data['results']]
+        self.assertEqual(codes, [f"C21002{i}" for i in range(5)])
+    
+    def test_search_words(self):
+        """Test a word search matches descriptions"""
+        url = reverse('diagnosis-code-list-create')
+        response = self.client.get(url, {'search': 'description'})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 20)  # First page of 25
+    
+    def test_search_too_short_is_ignored(self):
+        """Test blank and one-character searches list codes unfiltered"""
+        url = reverse('diagnosis-code-list-create')
+        for search in ('  ', 'x'):
+            response = self.client.get(url, {'search': search})
+            self.assertEqual(len(response.data['results']), 20)
+    
+    def search_tables(self, search):
+        """Run a search, returning its codes and the SQL it ran"""
+        url = reverse('diagnosis-code-list-create')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'search': search})
+        codes = [code['full_code'] for code in response.data['results']]
+        return codes, ' '.join(query['sql'] for query in queries)
+    
+    def test_search_reads_view_when_current(self):
+        """Test active-code searches read the search view after a refresh"""
+        codes, sql = self.search_tables('C210001')
+        
+        self.assertEqual(codes, ['C210001'])
+        self.assertIn('diagnosis_code_search', sql)
+    
+    def test_search_sees_writes_before_refresh(self):
+        """Test searches read the main table while the view is stale"""
+        DiagnosisCode.objects.create(
+            category=self.category,
+            diagnosis_code="9999",
+            full_code="C219999",
+            abbreviated_description="Autocomplete target",
+            full_description="Autocomplete target",
+            icd_version=10
+        )
+        DiagnosisCode.objects.filter(full_code='C210001').delete()
+        code = DiagnosisCode.objects.get(full_code='C210002')
+        code.is_active = False
+        code.save()
+        
+        codes, sql = self.search_tables('autocomplete')
+        self.assertEqual(codes, ['C219999'])
+        self.assertNotIn('diagnosis_code_search', sql)
+        self.assertEqual(self.search_tables('C210001')[0], [])
+        self.assertEqual(self.search_tables('C210002')[0], [])
+        
+        call_command('refresh_code_search', stdout=StringIO())
+        codes, sql = self.search_tables('target')  # Not a cached page
+        self.assertEqual(codes, ['C219999'])
+        self.assertIn('diagnosis_code_search', sql)
+    
+    def test_search_include_inactive(self):
+        """Test searching inactive codes reads the main table"""
+        DiagnosisCode.objects.create(
+            category=self.category,
+            diagnosis_code="9998",
+            full_code="C219998",
+            abbreviated_description="Retired code",
+            full_description="Retired code",
+            icd_version=10,
+            is_active=False
+        )
+        url = reverse('diagnosis-code-list-create')
+        response = self.client.get(url, {'search': 'retired', 'include_inactive': 'true'})
+        
+        codes = [code['full_code'] for code in response.data['results']]
+        self.assertEqual(codes, ['C219998'])
+    
+    def test_list_codes_fields_projection(self):
+        """Test ?fields= returns only the requested keys"""
+        url = reverse('diagnosis-code-list-create')
+        response = self.client.get(url, {'fields': 'id,abbreviated_description,bogus'})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            set(response.data['results'][0]),
+            {'id', 'abbreviated_description'}
+        )
+        # The cursor is still built from full_code
+        next_page = self.client.get(response.data['next'])
+        self.assertEqual(len(next_page.data['results']), 5)
+        self.assertEqual(set(next_page.data['results'][0]), {'id', 'abbreviated_description'})
+    
+    # ==================== CACHING TESTS ====================
+    
+    def test_list_codes_served_from_cache(self):
+        """Test repeated list request skips the database"""
+        url = reverse('diagnosis-code-list-create')
+        first = self.client.get(url)
+        
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+        
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+    
+    def test_list_codes_cache_invalidated_on_write(self):
+        """Test creating a code is visible on the next list request"""
+        url = reverse('diagnosis-code-list-create')
+        self.client.get(url, {'page_size': 100})
+        
+        self.client.post(url, {
+            'category': self.category.id,
+            'diagnosis_code': '9999',
+            'full_code': 'C219999',
+            'abbreviated_description': 'New test code',
+            'full_description': 'New test code full description',
+            'icd_version': 'ICD-10',
+            'is_active': True
+        }, format='json')
+        
+        response = self.client.get(url, {'page_size': 100})
+        full_codes = [code['full_code'] for code in response.data['results']]
+        self.assertIn('C219999', full_codes)
+    
+    @override_settings(LIST_CACHE_ENABLED=False)
+    def test_list_codes_not_cached_without_shared_cache(self):
+        """Test list pages skip the cache and ETags when caching is off"""
+        url = reverse('diagnosis-code-list-create')
+        self.client.get(url)
+        
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertNotIn('ETag', response)
+    
+    def test_list_codes_public_and_compressed(self):
+        """Test list pages are cacheable by clients and gzip-encoded on request"""
+        url = reverse('diagnosis-code-list-create')
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('max-age=300', response['Cache-Control'])
+        self.assertIn('Accept', response['Vary'])
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+    
+    def test_list_codes_not_modified(self):
+        """Test a matching If-None-Match gets a bodyless 304"""
+        url = reverse('diagnosis-code-list-create')
+        etag = self.client.get(url)['ETag']
+        
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+        self.assertIn('max-age=300', response['Cache-Control'])
+        self.assertIn('Accept', response['Vary'])
+        self.assertIn('Accept-Encoding', response['Vary'])
+    
+    def test_create_code_ignores_list_etag(self):
+        """Test list ETag preconditions don't apply to a create"""
+        url = reverse('diagnosis-code-list-create')
+        data = {
+            'category': self.category.id,
+            'diagnosis_code': '9999',
+            'full_code': 'C219999',
+            'abbreviated_description': 'New test code',
+            'full_description': 'New test code full description',
+            'icd_version': 'ICD-10',
+        }
+        response = self.client.post(url, data, format='json', HTTP_IF_MATCH='"stale"')
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('ETag', response)
+    
+    def test_list_codes_etag_changes_on_write(self):
+        """Test a stale ETag gets the full, updated list"""
+        url = reverse('diagnosis-code-list-create')
+        etag = self.client.get(url)['ETag']
+        
+        code = DiagnosisCode.objects.get(full_code='C210000')
+        code.abbreviated_description = 'Renamed'
+        code.save()
+        
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['results'][0]['abbreviated_description'], 'Renamed')
+    
     # ==================== PERFORMANCE TEST ====================
     
+    def test_list_codes_query_count(self):
+        """
+        Test: List endpoint avoids N+1 queries on category
+        Expect a single SELECT joined to category (cursor pagination has no COUNT)
+        """
+        url = reverse('diagnosis-code-list-create')
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['category_code'], 'C21')
+    
+    def test_retrieve_code_query_count(self):
+        """Test detail endpoint loads nested category in the same query"""
+        code = DiagnosisCode.objects.first()
+        url = reverse('diagnosis-code-detail', kwargs={'pk': code.id})
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        
+        self.assertEqual(response.data['category_details']['code'], 'C21')
+    
+    
     def test_response_time_under_100ms(self):
         """
         Test: API responds within 100ms
@@ -309,11 +580,13 @@ class DiagnosisCodeAPITest(TestCase):
         )
 
 
+@override_settings(LIST_CACHE_ENABLED=True)
 class DiagnosisCategoryAPITest(TestCase):
     """Test DiagnosisCategory API endpoints"""
     
     def setUp(self):
         self.client = APIClient()
+        cache.clear()
         self.category_data = {
             'code': 'C21',
             'title': 'Malignant neoplasm of anus and anal canal',
@@ -330,9 +603,63 @@ class DiagnosisCategoryAPITest(TestCase):
     
     def test_list_categories(self):
         """Test listing categories"""
-        DiagnosisCategory.objects.create(**self.category_data)
+        # The API takes the "ICD-10" label, the model stores the number
+        DiagnosisCategory.objects.create(**{**self.category_data, 'icd_version': 10})
         url = reverse('diagnosis-category-list-create')
         response = self.client.get(url)
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertGreater(len(response.data['results']), 0)
\ No newline at end of file
+        self.assertGreater(len(response.data['results']), 0)
+    
+    def test_delete_category(self):
+        """Test deleting a category with no codes"""
+        category = DiagnosisCategory.objects.create(**{**self.category_data, 'icd_version': 10})
+        url = reverse('diagnosis-category-detail', kwargs={'pk': category.id})
+        response = self.client.delete(url)
+        
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(DiagnosisCategory.objects.filter(id=category.id).exists())
+    
+    def test_delete_category_with_codes(self):
+        """Test a category still referenced by codes is kept"""
+        category = DiagnosisCategory.objects.create(**{**self.category_data, 'icd_version': 10})
+        DiagnosisCode.objects.create(
+            category=category,
+            diagnosis_code="0000",
+            full_code="C210000",
+            abbreviated_description="Test code",
+            full_description="Full description for test code",
+            icd_version=10
+        )
+        url = reverse('diagnosis-category-detail', kwargs={'pk': category.id})
+        response = self.client.delete(url)
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(DiagnosisCategory.objects.filter(id=category.id).exists())
+
+    def test_delete_category_with_code_added_concurrently(self):
+        """Test a code inserted after the checks still gets a 400, not a 500"""
+        category = DiagnosisCategory.objects.create(**{**self.category_data, 'icd_version': 10})
+        url = reverse('diagnosis-category-detail', kwargs={'pk': category.id})
+        with mock.patch.object(DiagnosisCategory, 'delete', side_effect=IntegrityError):
+            response = self.client.delete(url)
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_list_categories_query_count(self):
+        """
+        Test listing categories doesn't query per category
+        Why? The category serializer has no nested codes, so a page must
+        cost the same few queries however many categories it holds:
+        the pg_class estimate, COUNT(*) (the table is small) and the page
+        """
+        DiagnosisCategory.objects.bulk_create([
+            DiagnosisCategory(code=f"C{i:02d}", title=f"Category {i}", icd_version=10)
+            for i in range(20)
+        ])
+        url = reverse('diagnosis-category-list-create')
+        
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        
+        self.assertEqual(len(response.data['results']), 20)
\ No newline at end of file
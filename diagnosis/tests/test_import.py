@@ -0,0 +1,112 @@
+import os
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from diagnosis.management.commands.import_icd import Command
+from diagnosis.models import DiagnosisCategory, DiagnosisCode
+
+"""
+Import Command Tests
+
+Why test import_icd?
+- It writes through COPY, raw SQL and the ORM depending on the data
+- New/updated counts and skipped rows are what operators read
+- --drop-indexes must never leave the table without its indexes
+"""
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "import")
+
+
+class ImportICDCommandTest(TestCase):
+    """Test the import_icd management command on small fixture CSVs"""
+
+    def run_import(self, *args):
+        out = StringIO()
+        call_command("import_icd", "--data-dir", FIXTURES, *args, stdout=out)
+        return out.getvalue()
+
+    def index_names(self, unique=False):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT c.relname FROM pg_index i "
+                "JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE i.indrelid = %s::regclass AND i.indisunique = %s",
+                [DiagnosisCode._meta.db_table, unique],
+            )
+            return {row[0] for row in cursor.fetchall()}
+
+    def test_first_import_copies_new_rows(self):
+        """Test a first import loads every row as new through COPY"""
+        with mock.patch.object(Command, "_copy", autospec=True, side_effect=Command._copy) as copy:
+            output = self.run_import()
+
+        self.assertEqual(copy.call_count, 2)  # One batch each of categories and codes
+        self.assertIn("Categories: 2 new, 0 updated", output)
+        self.assertIn("Codes: 3 new, 0 updated", output)
+        self.assertEqual(DiagnosisCategory.objects.filter(icd_version=10).count(), 2)
+        self.assertEqual(DiagnosisCode.objects.filter(icd_version=10).count(), 3)
+
+    def test_second_import_updates_rows(self):
+        """Test re-importing the same files counts every row as updated"""
+        self.run_import()
+        DiagnosisCode.objects.filter(full_code="A001").update(abbreviated_description="Edited")
+
+        with mock.patch.object(Command, "_copy") as copy:
+            output = self.run_import()
+
+        copy.assert_not_called()
+        self.assertIn("Categories: 0 new, 2 updated", output)
+        self.assertIn("Codes: 0 new, 3 updated", output)
+        code = DiagnosisCode.objects.get(full_code="A001")
+        self.assertEqual(code.abbreviated_description, "Cholera due to Vibrio cholerae 01, biovar eltor")
+
+    def test_raw_import_upserts(self):
+        """Test --raw upserts existing rows with execute_values"""
+        self.run_import()
+        DiagnosisCode.objects.filter(full_code="A001").update(abbreviated_description="Edited")
+
+        with mock.patch.object(
+            Command, "_upsert_raw", autospec=True, side_effect=Command._upsert_raw
+        ) as upsert_raw:
+            output = self.run_import("--raw")
+
+        self.assertEqual(upsert_raw.call_count, 2)
+        self.assertIn("Codes: 0 new, 3 updated", output)
+        code = DiagnosisCode.objects.get(full_code="A001")
+        self.assertEqual(code.abbreviated_description, "Cholera due to Vibrio cholerae 01, biovar eltor")
+
+    def test_missing_category_is_skipped(self):
+        """Test a code whose category isn't in the file is reported and skipped"""
+        output = self.run_import()
+
+        self.assertIn("Category not found for code Z990: Z99", output)
+        self.assertFalse(DiagnosisCode.objects.filter(full_code="Z990").exists())
+
+    def test_duplicate_key_keeps_last_row(self):
+        """Test a code repeated within a batch takes its last row's values"""
+        self.run_import()
+
+        code = DiagnosisCode.objects.get(full_code="A000", icd_version=10)
+        self.assertEqual(code.abbreviated_description, "Cholera, revised")
+
+    def test_drop_indexes_restored_after_failure(self):
+        """Test --drop-indexes drops every non-unique index and rebuilds them when the import fails"""
+        indexes = self.index_names()
+        unique_indexes = self.index_names(unique=True)
+        during_import = []
+
+        def fail(*args):
+            during_import.append((self.index_names(), self.index_names(unique=True)))
+            raise RuntimeError("boom")
+
+        with mock.patch.object(Command, "_import", side_effect=fail):
+            with self.assertRaises(RuntimeError):
+                self.run_import("--drop-indexes")
+
+        # Meta.indexes, db_index=True fields and the category FK index
+        self.assertIn("dx_ver_active_code_idx", indexes)
+        self.assertTrue(any(name.endswith("_like") for name in indexes))
+        self.assertEqual(during_import, [(set(), unique_indexes)])
+        self.assertEqual(self.index_names(), indexes)
@@ -24,13 +24,13 @@ class DiagnosisCategoryModelTest(TestCase):
         self.category = DiagnosisCategory.objects.create(
             code="C21",
             title="Malignant neoplasm of anus and anal canal",
-            icd_version="ICD-10"
+            icd_version=10
         )
     
     def test_category_creation(self):
         """Test basic category creation"""
         self.assertEqual(self.category.code, "C21")
-        self.assertEqual(self.category.icd_version, "ICD-10")
+        self.assertEqual(self.category.icd_version, 10)
         self.assertIsNotNone(self.category.created_at)
         self.assertIsNotNone(self.category.id)
     
@@ -48,7 +48,7 @@ class DiagnosisCategoryModelTest(TestCase):
             DiagnosisCategory.objects.create(
                 code="C21",
                 title="Duplicate",
-                icd_version="ICD-10"  # Same code+version = error
+                icd_version=10  # Same code+version = error
             )
     
     def test_category_same_code_different_version(self):
@@ -59,7 +59,7 @@ class DiagnosisCategoryModelTest(TestCase):
         category_v9 = DiagnosisCategory.objects.create(
             code="C21",
             title="ICD-9 version",
-            icd_version="ICD-9"  # Different version = OK
+            icd_version=9  # Different version = OK
         )
         self.assertIsNotNone(category_v9.id)
         self.assertEqual(DiagnosisCategory.objects.filter(code="C21").count(), 2)
@@ -72,7 +72,7 @@ class DiagnosisCodeModelTest(TestCase):
         self.category = DiagnosisCategory.objects.create(
             code="A0",
             title="Test Category",
-            icd_version="ICD-10"
+            icd_version=10
         )
         self.code = DiagnosisCode.objects.create(
             category=self.category,
@@ -80,13 +80,13 @@ class DiagnosisCodeModelTest(TestCase):
             full_code="A01234",
             abbreviated_description="Test abbrev",
             full_description="Test full description",
-            icd_version="ICD-10"
+            icd_version=10
         )
     
     def test_code_creation(self):
         """Test basic code creation"""
         self.assertEqual(self.code.full_code, "A01234")
-        self.assertEqual(self.code.icd_version, "ICD-10")
+        self.assertEqual(self.code.icd_version, 10)
         self.assertTrue(self.code.is_active)  # Default value
         self.assertIsNotNone(self.code.created_at)
     
@@ -99,7 +99,7 @@ class DiagnosisCodeModelTest(TestCase):
                 full_code="A01234",  # Duplicate full_code
                 abbreviated_description="Duplicate",
                 full_description="Duplicate",
-                icd_version="ICD-10"  # Same version = error
+                icd_version=10  # Same version = error
             )
     
     def test_code_same_code_different_version(self):
@@ -110,7 +110,7 @@ class DiagnosisCodeModelTest(TestCase):
             full_code="A01234",  # Same code
             abbreviated_description="ICD-9 version",
             full_description="ICD-9 version",
-            icd_version="ICD-9"  # Different version = OK
+            icd_version=9  # Different version = OK
         )
         self.assertIsNotNone(code_v9.id)
     
@@ -0,0 +1,74 @@
+from django.core.paginator import EmptyPage
+from django.db import connection
+from django.test import TestCase
+from diagnosis.models import DiagnosisCategory
+from diagnosis.pagination import EstimatedCountPaginator
+
+"""
+Pagination Tests
+
+Why test pagination?
+- Estimated counts must only replace COUNT(*) where they are safe
+- Small or filtered result sets must keep exact counts
+"""
+
+
+class EstimatedCountPaginatorTest(TestCase):
+    """Test EstimatedCountPaginator count selection"""
+
+    @classmethod
+    def setUpTestData(cls):
+        DiagnosisCategory.objects.bulk_create([
+            DiagnosisCategory(code=f"C{i:02d}", title=f"Category {i}", icd_version=10)
+            for i in range(25)
+        ])
+        DiagnosisCategory.objects.create(code="001", title="ICD-9 category", icd_version=9)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE diagnosis_diagnosiscategory")
+
+    def test_small_table_uses_exact_count(self):
+        """Below the threshold the exact count is used"""
+        paginator = EstimatedCountPaginator(DiagnosisCategory.objects.order_by("code"), 20)
+        self.assertEqual(paginator.count, 26)
+
+    def test_unfiltered_queryset_uses_estimate(self):
+        """Above the threshold the pg_class estimate is used"""
+        paginator = EstimatedCountPaginator(DiagnosisCategory.objects.order_by("code"), 20)
+        paginator.estimate_threshold = 1
+        with self.assertNumQueries(1):
+            self.assertEqual(paginator.count, 26)  # reltuples after ANALYZE
+
+    def test_filtered_queryset_uses_exact_count(self):
+        """Filters make the table estimate wrong, so COUNT(*) is used"""
+        queryset = DiagnosisCategory.objects.filter(icd_version=9).order_by("code")
+        paginator = EstimatedCountPaginator(queryset, 20)
+        paginator.estimate_threshold = 1
+        self.assertEqual(paginator.count, 1)
+
+    def test_short_page_recounts_exactly(self):
+        """A stale, too-high estimate doesn't link past the real last page"""
+        DiagnosisCategory.objects.filter(icd_version=10, code__gte="C15").delete()
+        paginator = EstimatedCountPaginator(DiagnosisCategory.objects.order_by("code"), 20)
+        paginator.estimate_threshold = 1
+
+        page = paginator.page(1)
+        self.assertEqual(len(page), 16)
+        self.assertFalse(page.has_next())
+        self.assertEqual(paginator.count, 16)
+        with self.assertRaises(EmptyPage):
+            paginator.page(2)
+
+    def test_page_past_estimate_recounts_exactly(self):
+        """A stale, too-low estimate doesn't 404 on pages that exist"""
+        DiagnosisCategory.objects.bulk_create([
+            DiagnosisCategory(code=f"D{i:02d}", title=f"Category {i}", icd_version=10)
+            for i in range(20)
+        ])
+        paginator = EstimatedCountPaginator(DiagnosisCategory.objects.order_by("code"), 20)
+        paginator.estimate_threshold = 1
+
+        self.assertEqual(paginator.num_pages, 2)  # From reltuples (26)
+        page = paginator.page(3)
+        self.assertEqual(len(page), 6)
+        self.assertEqual(paginator.count, 46)
+        self.assertFalse(page.has_next())
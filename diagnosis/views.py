@@ -1,11 +1,30 @@
+import re
 from rest_framework import status
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
+from django.contrib.postgres.search import SearchQuery
+from django.db import IntegrityError
+from django.db.models import F, ProtectedError, Q
 from drf_spectacular.utils import extend_schema, OpenApiResponse
-from .models import DiagnosisCode, DiagnosisCategory
+from .caching import (
+    CATEGORIES,
+    CODES,
+    cached_list,
+    list_conditional,
+    public_list_response,
+    search_view_is_current,
+    store_list,
+)
+from .models import (
+    ICD_VERSION_LABELS,
+    DiagnosisCode,
+    DiagnosisCodeSearch,
+    DiagnosisCategory,
+    parse_icd_version,
+)
+from .pagination import EstimatedCountPagination
 from .serializers import (
     DiagnosisCodeSerializer,
     DiagnosisCodeListSerializer,
@@ -13,26 +32,109 @@ from .serializers import (
 )
 
 
+# Looks like (part of) an ICD code: "J45", "J45.9", "250.00", "V70"
+ICD_CODE_PATTERN = re.compile(r'^[A-Za-z]?\d[0-9A-Za-z.]*$')
+# Terms this short are matched as substrings rather than words
+SUBSTRING_SEARCH_MAX_LENGTH = 3
+# Shorter terms match nearly every code, so they don't filter at all
+MIN_SEARCH_LENGTH = 2
+
+
+def _search_filter(search):
+    """
+    Build the Q for ?search=, or an empty Q() when there is nothing
+    worth searching for (blank or single-character input)
+
+    Why two paths?
+    - Words ("asthma", "acute bronchitis") go through full-text search,
+      served by the dx_search_tsv GIN index
+    - Codes and very short terms are partial by nature ("J45" should find
+      J450, J4520...), which whole-word matching misses. Those use
+      icontains, served by the dx_search_trgm trigram index
+    """
+    search = search.strip()
+    if len(search) < MIN_SEARCH_LENGTH:
+        return Q()
+    if len(search) <= SUBSTRING_SEARCH_MAX_LENGTH or ICD_CODE_PATTERN.match(search):
+        # Codes are stored without the dot: "J45.9" -> "J459"
+        return (
+            Q(full_code__icontains=search.replace('.', '')) |
+            Q(abbreviated_description__icontains=search)
+        )
+    # websearch accepts "quoted phrases", OR and -exclusions
+    return Q(search_tsv=SearchQuery(search, search_type='websearch', config='simple'))
+
+
+# Keys a code list row can have, in response order
+# ?fields=a,b,c selects from these
+CODE_LIST_FIELDS = (
+    'id',
+    'full_code',
+    'abbreviated_description',
+    'icd_version',
+    'is_active',
+    'category_code',
+)
+
+
+def _code_list_fields(requested):
+    """
+    The CODE_LIST_FIELDS named in ?fields=, e.g. "id,full_code" for a
+    dropdown. Unknown names are ignored; none at all means every field
+    """
+    if not requested:
+        return CODE_LIST_FIELDS
+    names = {name.strip() for name in requested.split(',')}
+    return tuple(field for field in CODE_LIST_FIELDS if field in names) or CODE_LIST_FIELDS
+
+
+# Query param values read as "yes"
+TRUTHY = frozenset({'true', '1', 'yes'})
+
+# The filter kwargs each ?param contributes to the diagnosis code list
+# Why a table? Filters are declared once, merged into a single dict and
+# applied with one .filter(**kwargs) call
+CODE_LIST_FILTERS = {
+    # "ICD-10" -> 10; an unknown version simply matches nothing
+    'icd_version': lambda value: {'icd_version': parse_icd_version(value)},
+    'include_inactive': lambda value: (
+        {} if value.lower() in TRUTHY else {'is_active': True}
+    ),
+    'category': lambda value: {'category_id': value},
+}
+# Applied when the param is missing: only active codes by default
+CODE_LIST_DEFAULTS = {'include_inactive': 'false'}
+
 
 @extend_schema(
     request=DiagnosisCategorySerializer,
     responses={200: OpenApiResponse(response=DiagnosisCodeListSerializer(many=True))}
 )
+@list_conditional(CATEGORIES)
 @api_view(['GET', 'POST'])
 def diagnosis_category_list_create(request):
     """
     List all diagnosis categories or create a new one
     """
     if request.method == 'GET':
+        # Repeated queries are served from cache until the next write
+        cache_key, cached = cached_list(CATEGORIES, request)
+        if cached is not None:
+            return public_list_response(Response(cached, headers={'X-Cache': 'HIT'}))
+
         queryset = DiagnosisCategory.objects.all()
         icd_version = request.query_params.get('icd_version')
         if icd_version:
-            queryset = queryset.filter(icd_version=icd_version)
+            # "ICD-10" -> 10; an unknown version simply matches nothing
+            queryset = queryset.filter(icd_version=parse_icd_version(icd_version))
         queryset = queryset.order_by('icd_version', 'code')
         paginator = DiagnosisCodePagination()
         paginated_queryset = paginator.paginate_queryset(queryset, request)
         serializer = DiagnosisCategorySerializer(paginated_queryset, many=True)
-        return paginator.get_paginated_response(serializer.data)
+        response = paginator.get_paginated_response(serializer.data)
+        store_list(cache_key, response.data)
+        response['X-Cache'] = 'MISS'
+        return public_list_response(response)
     elif request.method == 'POST':
         serializer = DiagnosisCategorySerializer(data=request.data)
         if serializer.is_valid():
@@ -62,54 +164,111 @@ def diagnosis_category_detail(request, pk):
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     elif request.method == 'DELETE':
+        # Why check first? On PROTECT, delete() loads every related code
+        # before refusing; EXISTS stops at the first one (category index)
+        in_use = {"error": "Cannot delete category with associated diagnosis codes"}
+        if DiagnosisCode.objects.filter(category_id=category.pk).exists():
+            return Response(in_use, status=status.HTTP_400_BAD_REQUEST)
         try:
             category.delete()
-            return Response({"message": "Category deleted successfully"}, status=status.HTTP_204_NO_CONTENT)
-        except Exception:
-            return Response({"error": "Cannot delete category with associated diagnosis codes"}, status=status.HTTP_400_BAD_REQUEST)
+        except ProtectedError:
+            # delete()'s own PROTECT check found a code added since ours
+            return Response(in_use, status=status.HTTP_400_BAD_REQUEST)
+        except IntegrityError:
+            # A code added after that check too: the foreign key constraint
+            # rejects the delete when it commits
+            return Response(in_use, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"message": "Category deleted successfully"}, status=status.HTTP_204_NO_CONTENT)
 
 
-class DiagnosisCodePagination(PageNumberPagination):
+class DiagnosisCodePagination(EstimatedCountPagination):
     """
     Custom pagination for DiagnosisCode views
+    Unfiltered pages take their count from pg_class instead of COUNT(*)
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class DiagnosisCodeCursorPagination(CursorPagination):
+    """
+    Keyset pagination for the diagnosis code list
+
+    Why cursor instead of ?page=N?
+    - Each page is WHERE full_code > <last seen> LIMIT 20, served from the
+      (full_code, icd_version) unique index, however deep the page is
+    - OFFSET pagination scans and discards every row before the page
+
+    Why full_code first? DRF keys the cursor on the first ordering field
+    and uses an offset for ties; ties on full_code are only the same code
+    across ICD versions, so that offset stays tiny
     """
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 100
+    ordering = ('full_code', 'icd_version')
 
 
 @extend_schema(
     request=DiagnosisCodeSerializer,
     responses={200: OpenApiResponse(response=DiagnosisCodeListSerializer(many=True))}
 )
+@list_conditional(CODES)
 @api_view(['GET', 'POST'])
 def diagnosis_code_list_create(request):
     """
     List all diagnosis codes or create a new one
     """
     if request.method == 'GET':
-        queryset = DiagnosisCode.objects.select_related('category').all()
-        icd_version = request.query_params.get('icd_version')
-        if icd_version:
-            queryset = queryset.filter(icd_version=icd_version)
-        include_inactive = request.query_params.get('include_inactive', 'false')
-        if include_inactive.lower() != 'true':
-            queryset = queryset.filter(is_active=True)
-        category_id = request.query_params.get('category')
-        if category_id:
-            queryset = queryset.filter(category_id=category_id)
-        search = request.query_params.get('search')
+        # Repeated queries are served from cache until the next write
+        cache_key, cached = cached_list(CODES, request)
+        if cached is not None:
+            return public_list_response(Response(cached, headers={'X-Cache': 'HIT'}))
+
+        # Plain dicts holding only the columns DiagnosisCodeListSerializer renders
+        # Why? full_description can be large and is never shown in the list,
+        # and a page builds no model instances
+        filters = {}
+        for param, to_kwargs in CODE_LIST_FILTERS.items():
+            value = request.query_params.get(param) or CODE_LIST_DEFAULTS.get(param)
+            if value:
+                filters.update(to_kwargs(value))
+        search = _search_filter(request.query_params.get('search', ''))
+        # Active-only searches (the autocomplete case) read the narrow
+        # diagnosis_code_search materialized view instead of the main table,
+        # unless a write since its last refresh may have left it stale
+        use_view = search and filters.get('is_active') and search_view_is_current()
+        model = DiagnosisCodeSearch if use_view else DiagnosisCode
+        fields = _code_list_fields(request.query_params.get('fields'))
+        # full_code is always read: the cursor paginator keys on it
+        columns = [
+            field for field in CODE_LIST_FIELDS
+            if (field in fields or field == 'full_code') and field != 'category_code'
+        ]
+        # The category join is only made when category_code is wanted
+        joined = {'category_code': F('category__code')} if 'category_code' in fields else {}
+        queryset = model.objects.filter(**filters).values(*columns, **joined)
         if search:
-            queryset = queryset.filter(
-                Q(full_code__icontains=search) |
-                Q(abbreviated_description__icontains=search) |
-                Q(full_description__icontains=search)
-            )
-        queryset = queryset.order_by('icd_version', 'full_code')
-        paginator = DiagnosisCodePagination()
-        paginated_queryset = paginator.paginate_queryset(queryset, request)
-        serializer = DiagnosisCodeListSerializer(paginated_queryset, many=True)
-        return paginator.get_paginated_response(serializer.data)
+            queryset = queryset.filter(search)
+        # Ordering is applied by the cursor paginator
+        paginator = DiagnosisCodeCursorPagination()
+        page = paginator.paginate_queryset(queryset, request)
+        # The rows are already the dicts DiagnosisCodeListSerializer
+        # describes; they only need projecting to the requested fields and
+        # icd_version its label
+        # Why skip the serializer? Its per-field calls are most of the
+        # Python time of a page once the query is indexed
+        results = [{field: row[field] for field in fields} for row in page]
+        if 'icd_version' in fields:
+            for row in results:
+                row['icd_version'] = ICD_VERSION_LABELS[row['icd_version']]
+        # The next/previous cursors are built from the unprojected page
+        # the paginator kept, which still has full_code
+        response = paginator.get_paginated_response(results)
+        store_list(cache_key, response.data)
+        response['X-Cache'] = 'MISS'
+        return public_list_response(response)
 
     elif request.method == 'POST':
         serializer = DiagnosisCodeSerializer(data=request.data)
@@ -129,7 +288,11 @@ def diagnosis_code_detail(request, pk):
     """
     Retrieve, update, or delete a diagnosis code
     """
-    diagnosis_code = get_object_or_404(DiagnosisCode, pk=pk)
+    # select_related: category_details is rendered without a second query
+    # defer: search_tsv is never rendered and can be larger than the row
+    diagnosis_code = get_object_or_404(
+        DiagnosisCode.objects.select_related('category').defer('search_tsv'), pk=pk
+    )
     if request.method == 'GET':
         serializer = DiagnosisCodeSerializer(diagnosis_code)
         return Response(serializer.data)